@@ -16,24 +16,47 @@ Usage:
   python converter/convert_all.py --suffix _remid
   python converter/convert_all.py --force
   python converter/convert_all.py --manifest src/remid.ttl
+  python converter/convert_all.py --jobs 4
   # pass-through sound options (see --help)
 """
 
 from pathlib import Path
-import argparse, importlib.util, sys, re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import argparse, importlib.util, os, sys, re
 
 # --- utils -------------------------------------------------------------------
 
 def load_converter(mod_path: Path):
+    # Reuse an already-loaded converter (repeated imports, batch drivers)
+    mod = sys.modules.get("swi2remid")
+    if mod is not None and getattr(mod, "__file__", None) == str(mod_path):
+        return mod
     spec = importlib.util.spec_from_file_location("swi2remid", str(mod_path))
     if spec is None or spec.loader is None:
         raise RuntimeError(f"Cannot import converter from {mod_path}")
     mod = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(mod)  # type: ignore[attr-defined]
+    sys.modules["swi2remid"] = mod
+    try:
+        spec.loader.exec_module(mod)  # type: ignore[attr-defined]
+    except BaseException:
+        del sys.modules["swi2remid"]
+        raise
     return mod
 
 def safe_label(s: str) -> str:
-    return re.sub(r'\s+', ' ', s).strip() or "instrument"
+    # str.split() collapses whitespace runs and trims in one C-level pass
+    return " ".join(s.split()) or "instrument"
+
+def write_file(path: Path, data: bytes) -> None:
+    """Write pre-encoded data with plain os calls (no buffered text layer)."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
 
 def find_manifest(repo_root: Path, override: str | None) -> Path:
     if override:
@@ -43,42 +66,81 @@ def find_manifest(repo_root: Path, override: str | None) -> Path:
         return pref
     return (repo_root / "remid.ttl").resolve()
 
+_PRESET_TMPL = (
+    "<http://github.com/ssj71/reMID.lv2/blob/master/instruments/{fn}>\n"
+    "\ta pset:Preset ;\n"
+    "\tlv2:appliesTo <http://github.com/ssj71/reMID.lv2> ;\n"
+    "\trdfs:label \"{label}\" ;\n"
+    "\tstate:state [\n"
+    "\t\t<http://github.com/ssj71/reMID.lv2/blob/master/instruments/instruments.conf> <{fn}>\n"
+    "\t] .\n"
+)
+
 def preset_block(filename_conf: str, label: str) -> str:
-    subj = f"<http://github.com/ssj71/reMID.lv2/blob/master/instruments/{filename_conf}>"
-    state_key = "<http://github.com/ssj71/reMID.lv2/blob/master/instruments/instruments.conf>"
-    return (
-        f"{subj}\n"
-        f"\ta pset:Preset ;\n"
-        f"\tlv2:appliesTo <http://github.com/ssj71/reMID.lv2> ;\n"
-        f"\trdfs:label \"{label}\" ;\n"
-        f"\tstate:state [\n"
-        f"\t\t{state_key} <{filename_conf}>\n"
-        f"\t] .\n"
-    )
-
-def manifest_has_preset(text: str, filename_conf: str) -> bool:
-    return (f"/instruments/{filename_conf}>" in text) or \
-           (f"instruments.conf> <{filename_conf}>" in text)
+    return _PRESET_TMPL.format(fn=filename_conf, label=label)
+
+_PRESET_SUBJ_RE  = re.compile(r'/instruments/([^>]+\.conf)>')
+_PRESET_STATE_RE = re.compile(r'instruments\.conf> <([^>]+\.conf)>')
+
+def manifest_presets(text: str) -> set[str]:
+    """Collect every preset .conf filename already referenced in the manifest."""
+    return set(_PRESET_SUBJ_RE.findall(text)) | set(_PRESET_STATE_RE.findall(text))
 
 def append_presets_to_manifest(manifest_path: Path, additions: list[tuple[str, str]]) -> int:
     if not additions:
         return 0
     text = manifest_path.read_text(encoding="utf-8") if manifest_path.exists() else ""
+    existing = manifest_presets(text)
     appended = 0
     blocks = []
     for filename_conf, label in additions:
-        if manifest_has_preset(text, filename_conf):
+        if filename_conf in existing:
             continue
         blocks.append(preset_block(filename_conf, label))
         appended += 1
     if appended:
-        if text and not text.endswith("\n"): text += "\n"
-        if text and not text.endswith("\n\n"): text += "\n"
-        text += "\n".join(blocks)
+        # Only new blocks are written; keep one blank line before them
+        sep = ""
+        if text and not text.endswith("\n"): sep += "\n"
+        if text and not text.endswith("\n\n"): sep += "\n"
         manifest_path.parent.mkdir(parents=True, exist_ok=True)
-        manifest_path.write_text(text, encoding="utf-8")
+        with manifest_path.open("a", encoding="utf-8") as fh:
+            fh.write(sep)
+            fh.write("\n".join(blocks))
     return appended
 
+def iter_swi_files(in_dir: Path):
+    """Yield the .swi files in in_dir as the directory is read (unsorted)."""
+    with os.scandir(in_dir) as it:
+        for e in it:
+            if e.name.endswith(".swi") and e.is_file():
+                yield Path(e.path)
+
+def process_one(swi_path: Path, job: dict) -> tuple[str, str, str, str, str]:
+    """
+    Convert a single .swi and write its .conf (runs in a worker process).
+    Returns (swi_name, out_name, label, status, detail) with status OK / SKIP / FAIL.
+    """
+    try:
+        swi2remid = load_converter(job["converter"])
+        payload = swi2remid.read_payload(swi_path)
+        derived_name = swi2remid.payload_name(payload) or swi_path.stem
+        conf_text = swi2remid.emit(derived_name, payload, **job["emit"])
+
+        out_name = f"{swi_path.stem}{job['suffix']}.conf"
+        out_path = job["out_dir"] / out_name
+        # Label = the readable instrument name
+        label = safe_label(derived_name)
+
+        if out_name in job["existing"]:
+            return swi_path.name, out_name, label, "SKIP", str(out_path)
+        write_file(out_path, conf_text.encode("utf-8"))
+        return swi_path.name, out_name, label, "OK", str(out_path)
+
+    except (Exception, SystemExit) as e:
+        # read_payload() rejects bad files with SystemExit
+        return swi_path.name, "", "", "FAIL", str(e)
+
 # --- main --------------------------------------------------------------------
 
 def main():
@@ -89,13 +151,14 @@ def main():
     in_dir       = repo_root / "converter" / "sidwizard_instruments"
     out_dir      = repo_root / "instruments"
 
-    swi2remid = load_converter(converter_py)
+    load_converter(converter_py)  # fail early if the converter can't be imported
 
     ap = argparse.ArgumentParser()
     ap.add_argument("--suffix", default="", help="Filename suffix before .conf (e.g. _remid)")
     ap.add_argument("--overwrite", action="store_true", help="Overwrite existing files")
     ap.add_argument("--force", action="store_true", help="Alias for --overwrite")
     ap.add_argument("--manifest", default=None, help="Path under repo root to remid.ttl")
+    ap.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
     # pass-through converter options (sane defaults)
     ap.add_argument("--program-speed", type=int, default=50)
     ap.add_argument("--speed-mult", type=int, default=1)
@@ -104,6 +167,7 @@ def main():
     ap.add_argument("--no-emit-arp", action="store_true")
     ap.add_argument("--no-hard-restart", action="store_true")
     ap.add_argument("--sustain-frames", type=int, default=64)
+    ap.add_argument("--legacy-wait1", action="store_true")
     args = ap.parse_args()
 
     overwrite = args.overwrite or args.force
@@ -116,54 +180,51 @@ def main():
     manifest_path = find_manifest(repo_root, args.manifest)
     print(f"Manifest to update: {manifest_path}")
 
-    swi_files = sorted(in_dir.glob("*.swi"))
-    if not swi_files:
+    job = {
+        "converter": converter_py,
+        "out_dir": out_dir,
+        "suffix": args.suffix,
+        "existing": set() if overwrite else {e.name for e in os.scandir(out_dir)},
+        "emit": dict(
+            program_speed=args.program_speed,
+            speed_mult=args.speed_mult,
+            arp_plus1=args.arp_plus1,
+            strict_wf=args.strict_wf,
+            emit_arp=not args.no_emit_arp,
+            hard_restart=not args.no_hard_restart,
+            sustain_frames=max(1, args.sustain_frames),
+            legacy_wait1=args.legacy_wait1,
+        ),
+    }
+
+    # Files are independent: chunks go to the workers while the input folder
+    # is still being listed. Results are reported in name order so the log and
+    # the manifest additions stay deterministic.
+    with ProcessPoolExecutor(max_workers=args.jobs) as ex:
+        results = sorted(ex.map(process_one, iter_swi_files(in_dir), repeat(job), chunksize=8))
+    if not results:
         print(f"No .swi files found in {in_dir}")
         return
 
     converted = skipped = failed = 0
-    to_manifest: list[tuple[str, str]] = []
-
-    for swi_path in swi_files:
-        try:
-            print(f"Processing {swi_path.name}...")
-            payload = swi2remid.read_payload(swi_path)
-            derived_name = (payload[-8:].decode("ascii", "ignore").strip() or swi_path.stem)
-            conf_text = swi2remid.emit(
-                derived_name, payload,
-                program_speed=args.program_speed,
-                speed_mult=args.speed_mult,
-                arp_plus1=args.arp_plus1,
-                strict_wf=args.strict_wf,
-                emit_arp=not args.no_emit_arp,
-                hard_restart=not args.no-hard_restart if hasattr(args, "no-hard_restart") else not args.no_hard_restart,
-                sustain_frames=max(1, args.sustain_frames),
-            )
-
-            out_name = f"{swi_path.stem}{args.suffix}.conf"
-            out_path = out_dir / out_name
-
-            if out_path.exists() and not overwrite:
-                print(f"SKIP (exists)  {swi_path.name} -> {out_path.relative_to(repo_root)}")
-                skipped += 1
-            else:
-                out_path.write_text(conf_text, encoding="utf-8")
-                print(f"OK            {swi_path.name} -> {out_path.relative_to(repo_root)}")
-                converted += 1
-
-            # Label = the readable instrument name
-            to_manifest.append((out_name, safe_label(derived_name)))
-
-        except Exception as e:
-            print(f"FAIL          {swi_path.name}: {e}", file=sys.stderr)
-            failed += 1
+    to_manifest: dict[str, str] = {}    # filename -> label; last label wins
 
-    # Dedup by filename; last label wins
-    dedup = {}
-    for fn, lb in to_manifest:
-        dedup[fn] = lb
-    additions = list(dedup.items())
-    appended = append_presets_to_manifest(manifest_path, additions)
+    for swi_name, out_name, label, status, detail in results:
+        print(f"Processing {swi_name}...")
+        if status == "FAIL":
+            print(f"FAIL          {swi_name}: {detail}", file=sys.stderr)
+            failed += 1
+            continue
+        rel = Path(detail).relative_to(repo_root)
+        if status == "SKIP":
+            print(f"SKIP (exists)  {swi_name} -> {rel}")
+            skipped += 1
+        else:
+            print(f"OK            {swi_name} -> {rel}")
+            converted += 1
+        to_manifest[out_name] = label
+
+    appended = append_presets_to_manifest(manifest_path, list(to_manifest.items()))
 
     print(f"\nDone. Converted: {converted}, Skipped: {skipped}, Failed: {failed}")
     if appended:
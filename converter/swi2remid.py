@@ -28,15 +28,17 @@
 #   - v1_freq_hs <semitones>    (relative pitch in half-steps)
 #   - filter_cutoff <0..0x7FF>
 #   - filter_mode, fr_vic (packed res/routing)
+#   - wait <N>                  (idle N ticks; every script line itself takes 1)
 #
 # ====================================================================================
 
 from pathlib import Path
-import argparse, re
-<<<<<<< HEAD
+from array import array
+from functools import lru_cache
+from itertools import compress, repeat
+from operator import ne
+import argparse, glob, hashlib, os, shutil, struct, sys
 import math  #  for vibrato shapes
-=======
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
 
 # -------------------------------
 # SWI instrument-local byte map (SID-Wizard v1.7 layout)
@@ -49,7 +51,6 @@ PWPT = 0x0A           # pointer (byte offset within payload) to PW table
 FLPT = 0x0B           # pointer (byte offset within payload) to Filter table
 WF0  = 0x0F           # initial control register value for first frame (SID ctrl byte)
 
-<<<<<<< HEAD
 #  additional header bytes seen in SW 1.7 exports
 VIB_DEPTH = 0x05      # often used for instrument vibrato depth
 VIB_DELAY = 0x06      # often used for instrument vibrato delay (frames or ticks)
@@ -57,8 +58,29 @@ GO_WF = 0x0C          # optional "gate-off when WF table reaches row N"
 GO_PW = 0x0D          # optional "gate-off when PW table reaches row N"
 GO_FL = 0x0E          # optional "gate-off when FL table reaches row N"
 
-=======
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
+# Hex digits for every byte / 12-bit PW / 11-bit cutoff value, so the per-frame
+# script lines are assembled from lookups rather than int formatting
+HEX2 = tuple(f"{i:02X}" for i in range(0x100))
+HEX3 = tuple(f"{i:03X}" for i in range(0x1000))
+HEX4 = tuple(f"{i:04X}" for i in range(0x800))
+
+# str.translate() table for the instrument block name: every character other
+# than A-Z a-z 0-9 _ - becomes NUL (runs of NUL are then merged into one '-').
+# ASCII is listed explicitly; anything above it falls through to __missing__.
+class NameTrans(dict):
+    def __missing__(self, c):
+        return "\0"
+
+NAME_OK = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-"
+NAME_TRANS = NameTrans({c: chr(c) if chr(c) in NAME_OK else "\0" for c in range(0x80)})
+
+def sanitize_name(name: str) -> str:
+    """Block-header name: runs of disallowed characters become a single '-'."""
+    s = name.strip().translate(NAME_TRANS)
+    while "\0\0" in s:
+        s = s.replace("\0\0", "\0")
+    return s.replace("\0", "-") or "instrument"
+
 # ====================================================================================
 # I/O helpers
 # ====================================================================================
@@ -75,38 +97,43 @@ def read_payload(p: Path) -> bytes:
     # If there is a valid C64-ish load address and enough bytes, drop it.
     return b[2:] if 0x0300 <= load_addr <= 0xC000 and len(b) >= 34 else b
 
+# bytes.translate() table: printable ASCII kept, everything else becomes a space
+NAME_KEEP = bytes(c if 0x20 <= c < 0x7F else 0x20 for c in range(256))
+
+def payload_name(payload: bytes) -> str:
+    """
+    Instrument name stored in the last 8 payload bytes ('' if there is none).
+    Non-printable bytes count as spaces, so padding is trimmed by strip().
+    """
+    return payload[-8:].translate(NAME_KEEP).decode("ascii").strip()
+
 def rows(buf: bytes, off: int):
     """
     Read triplets starting at 'off' until 0xFF (terminator) is seen as the first byte.
     Each logical row is 3 bytes: (left, right, third). 0xFF ends the table.
     """
-    out = []
-    i = off
-    while i + 2 < len(buf):
-        if buf[i] == 0xFF:
-            break
-        out.append((buf[i], buf[i+1], buf[i+2]))
-        i += 3
-    return out
+    # Locate the terminator with C-level find(); only an FF on a row boundary counts
+    end = buf.find(b"\xFF", off)
+    while end >= 0 and (end - off) % 3:
+        end = buf.find(b"\xFF", end + 1)
+    if end < 0:
+        end = len(buf)
+    usable = max(0, (end - off) // 3 * 3)
+    return list(struct.iter_unpack("3B", buf[off:off + usable]))
 
 def cut_at_ff(buf: bytes, off: int, maxlen=512):
     """
-    Return raw bytes from 'off' up to and including the first 0xFF (or maxlen).
+    Return the first byte of each 3-byte row from 'off', up to and including
+    the first 0xFF (at most maxlen bytes).
     Useful for diagnostic comments at the end of the .conf.
     """
-    o = bytearray()
-    i = off
-    while i < len(buf) and len(o) < maxlen:
-        b = buf[i]
-        o.append(b)
-        if b == 0xFF:
-            break
-        i += 1 if b == 0xFF else 3
-    return bytes(o)
+    col = bytes(buf[off:off + 3 * maxlen:3])
+    end = col.find(0xFF)
+    return col if end < 0 else col[:end + 1]
 
 def hexb(bs: bytes) -> str:
     """Format a bytes object as space-separated hex string."""
-    return " ".join(f"{x:02X}" for x in bs)
+    return bs.hex(" ").upper()
 
 # ====================================================================================
 # Small utility helpers
@@ -119,13 +146,13 @@ def sanitize(ctrl: int) -> int:
     """
     return ctrl & ~0x08
 
-def band_to_mode(n: int) -> int:
-    """
-    Map SW band nibble (1,2,3) to reMID filter_mode bitmask:
-      1 -> low-pass, 2 -> band-pass, 3 -> high-pass
-    Defaults to LP if outside range.
-    """
-    return {1:0x1, 2:0x2, 3:0x4}.get(n & 0xF, 0x1)
+# Lookup tables for hot table loops:
+#   BAND_MODE: SW band nibble -> reMID filter_mode bitmask
+#              (1 -> low-pass, 2 -> band-pass, 3 -> high-pass; LP otherwise)
+#   SANITIZE:  sanitize() applied to every control byte
+BAND_MODE = (0x1, 0x1, 0x2, 0x4) + (0x1,) * 12
+SANITIZE  = bytes(sanitize(c) for c in range(256))
+NOISE_BIT = bytes(c >> 7 for c in range(256))     # 1 where the NOISE waveform is set
 
 def fe_jump_index(lo: int, hi: int, table_base: int, rows_count: int):
     """
@@ -140,13 +167,122 @@ def fe_jump_index(lo: int, hi: int, table_base: int, rows_count: int):
     idx = delta // 3
     return idx if 0 <= idx < rows_count else None
 
+def fe_jump_table(trows: list, table_base: int) -> list:
+    """
+    Resolve every FE row of a table once: entry i is fe_jump_index() of row i
+    if it is an FE row, else None. Lets table walkers jump by plain lookup.
+    """
+    n = len(trows)
+    return [fe_jump_index(r, t, table_base, n) if l == 0xFE else None
+            for (l, r, t) in trows]
+
+def fe_next_rows(trows: list, table_base: int) -> list[int]:
+    """
+    Row to continue at after each FE row of a PW/filter table. Bad or
+    self-pointing jumps fall through to the next row (wrapping), so walkers
+    can follow an FE row with a single lookup. Non-FE entries are unused.
+    """
+    n = len(trows)
+    return [(i + 1) % n if j is None or j == i else j
+            for i, j in enumerate(fe_jump_table(trows, table_base))]
+
+def ramp(cur: int, slope: int, n: int, lo: int, hi: int) -> array:
+    """
+    Return the n values of a saturating sweep: cur+slope, cur+2*slope, ...
+    clamped to lo..hi. Equivalent to stepping cur = clamp(cur + slope) n times
+    (cur must already be within lo..hi), but built with range() in C.
+    """
+    if slope == 0:
+        return array("H", [cur]) * n
+    bound = hi if slope > 0 else lo
+    free = min(n, (bound - cur) // slope)     # steps before the sweep saturates
+    seg = array("H", range(cur + slope, cur + slope * free + (1 if slope > 0 else -1), slope))
+    if free < n:
+        seg += array("H", [bound]) * (n - free)
+    return seg
+
+def sweep_into(out: array, f: int, cur: int, slope: int, n: int, lo: int, hi: int) -> int:
+    """
+    Write the n frames of a saturating sweep (see ramp()) into out[f:f+n] and
+    return the last value. Sweeps of one or two frames are stepped directly,
+    which is cheaper than building a ramp array for them.
+    """
+    if n < 3:
+        for k in range(f, f + n):
+            cur = max(lo, min(hi, cur + slope))
+            out[k] = cur
+        return cur
+    out[f:f + n] = ramp(cur, slope, n, lo, hi)
+    return out[f + n - 1]
+
+def repeat_each(seq, k: int):
+    """
+    Copy of seq (list, bytearray or array) with every element repeated k times
+    in a row. Built with k strided slice assignments instead of per element.
+    """
+    out = seq * k
+    for j in range(k):
+        out[j::k] = seq
+    return out
+
+# Event kinds, in the order a frame's script lines are written
+EV_CTRL, EV_PW, EV_FL, EV_ARP, EV_GATE, EV_MARK = range(6)
+
+def change_frames(seq, start: int, stop: int, step: int = 1):
+    """
+    Yield the frames f in start..stop-1 (start >= 1) where seq[f] != seq[f-1].
+    The comparison runs in C over two offset slices. A track that can only
+    change every 'step' frames (a row-granular one) passes that step so only
+    the multiples of it are compared.
+    """
+    start = -(-start // step) * step     # first multiple of step >= start
+    return compress(range(start, stop, step),
+                    map(ne, seq[start:stop:step], seq[start-1:stop-1:step]))
+
+def build_events(wf, pw, fl, ar, start: int, stop: int,
+                 steps: tuple = (1, 1, 1, 1)) -> list:
+    """
+    Merge the changes of the per-frame control/PW/cutoff/ARP tracks over frames
+    start..stop-1 (start >= 1) into one sorted list of (frame, kind, value).
+    EV_ARP values are the delta to the previous frame, the others the new
+    value. Tracks passed as None are skipped; steps gives each track's
+    change granularity (see change_frames).
+    """
+    events = []
+    for kind, seq, step in zip((EV_CTRL, EV_PW, EV_FL, EV_ARP), (wf, pw, fl, ar), steps):
+        if seq is None:
+            continue
+        frames = list(change_frames(seq, start, stop, step))
+        if kind == EV_ARP:
+            values = [seq[f] - seq[f-1] for f in frames]
+        else:
+            values = map(seq.__getitem__, frames)
+        events += zip(frames, repeat(kind), values)
+    events.sort()
+    return events
+
+def add_wait(lines: list, t: int, frames: int, legacy: bool = False) -> int:
+    """
+    Append script lines (numbered from t) that idle for the given number of
+    frames and return the next line number. Every line takes one tick and
+    'wait N' takes N+1, so k frames of 'wait 1' (2k ticks) collapse exactly
+    into a single 'wait 2k-1'.
+    """
+    if legacy:
+        lines += [f".{t + i}=wait 1" for i in range(frames)]
+        return t + frames
+    lines.append(f".{t}=wait {2 * frames - 1}")
+    return t + 1
+
 # ====================================================================================
 # Pulse Width (PW) materializer
 # ====================================================================================
 
-def mat_pw(payload: bytes, pwrows: list, frames: int, pw_base: int) -> list[int]:
+def mat_pw(payload: bytes, pwrows: list, frames: int, pw_base: int) -> array:
     """
-    Build a per-frame list of 12-bit PW values (0x001..0xFFF) from the PW table.
+    Build a per-frame array('H') of 12-bit PW values (0x001..0xFFF) from the PW table.
+    Every entry is at least 1 (SID treats PW 0 as silent), so callers can
+    format the track directly without re-clamping.
     Behavior mirrors SID-Wizard tables:
 
     Row encodings:
@@ -161,7 +297,7 @@ def mat_pw(payload: bytes, pwrows: list, frames: int, pw_base: int) -> list[int]
 
     Loop safety:
       - If FE jumps to itself or cycles without consuming frames, we advance and
-        eventually hold (watchdogs prevent infinite loops).
+        eventually hold (a spin watchdog prevents infinite loops).
 
     Also:
       - If the table only contains a single absolute set and no sweep rows,
@@ -171,60 +307,52 @@ def mat_pw(payload: bytes, pwrows: list, frames: int, pw_base: int) -> list[int]
     # Header guess for initial PW (many SWI variants store PW lo@5, hi@6)
     hdr_guess = ((payload[6] << 8) | payload[5]) & 0x0FFF
 
-    # Find first absolute PW set (preferred initial value)
+    # One pass: first absolute PW set (preferred initial value), sweep presence
+    # and absolute-row count. Stop as soon as the hold fast-path is ruled out.
     init_pw = None
+    has_sweep = False
+    abs_sets = 0
     for (l, r, _t) in pwrows:
-        if (l & 0x80) and l not in (0xFE, 0xFF):
-            init_pw = ((l & 0x0F) << 8) | (r & 0xFF)
+        if l == 0xFE or l == 0xFF:
+            continue
+        if l & 0x80:
+            if init_pw is None:
+                init_pw = ((l & 0x0F) << 8) | (r & 0xFF)
+            abs_sets += 1
+        else:
+            has_sweep = True
+        if init_pw is not None and (has_sweep or abs_sets > 1):
             break
     if init_pw is None:
         init_pw = hdr_guess if hdr_guess else 0x800
     if init_pw <= 0:
         init_pw = 1
 
-    out = [init_pw] * max(1, frames)
-    if not pwrows:
-        return out
+    out = array("H", [init_pw]) * max(1, frames)
 
-    # Quick exits for "no time-consuming rows"
-    has_any_time = any(l not in (0xFE, 0xFF) for (l, _, __) in pwrows)
-    if not has_any_time:
-        return out
-    has_sweep = any((l not in (0xFE, 0xFF)) and ((l & 0x80) == 0) for (l, _, __) in pwrows)
-    abs_sets = sum(1 for (l, _, __) in pwrows if (l & 0x80) and l not in (0xFE, 0xFF))
+    # No time-consuming rows, or only one absolute row → hold it forever
     if not has_sweep and abs_sets <= 1:
-        # Only one absolute row → hold it forever
         return out
 
-    # March the table across 'frames', honoring FE/FF, with loop watchdogs
+    # March the table across 'frames', honoring FE/FF, with loop watchdogs.
+    # FE targets are resolved up front; a bad/degenerate jump just steps to the
+    # next row, so the loop below never has to look at jump pointers.
+    n_rows = len(pwrows)
+    jump = fe_next_rows(pwrows, pw_base)
     i = 0               # row index
     f = 0               # frame index
     cur = init_pw
-    spin = 0
-    max_spin = len(pwrows) + 4
-    last_f = -1
-    no_progress = 0
-    max_no_progress = len(pwrows) * 4 + 16
+    spin = 0            # table steps taken without consuming a frame
+    max_spin = n_rows + 4
+    seen = {}           # (row, PW) at a time-consuming row -> frame
 
     while f < frames:
-        # General watchdog: if frames don't advance for a while, hold and exit.
-        if f == last_f:
-            no_progress += 1
-            if no_progress > max_no_progress:
-                for k in range(f, frames):
-                    out[k] = cur
-                break
-        else:
-            no_progress = 0
-            last_f = f
-
         # Wrap row index and protect against "spin"
-        if i >= len(pwrows):
+        if i >= n_rows:
             i = 0
             spin += 1
             if spin > max_spin:
-                for k in range(f, frames):
-                    out[k] = cur
+                out[f:frames] = array("H", [cur]) * (frames - f)
                 break
             continue
 
@@ -232,29 +360,33 @@ def mat_pw(payload: bytes, pwrows: list, frames: int, pw_base: int) -> list[int]
 
         # End: hold remaining frames
         if l == 0xFF:
-            for k in range(f, frames):
-                out[k] = cur
+            out[f:frames] = array("H", [cur]) * (frames - f)
             break
 
-        # FE: jump to pointer (right/third), with loop safety
+        # FE: jump to pointer (right/third), with loop safety. Jumps consume no
+        # time, so more of them in a row than there are rows means a cycle.
         if l == 0xFE:
-            j = fe_jump_index(r, t, pw_base, len(pwrows))
-            if j is None or j == i:
-                # Bad/degenerate jump → try next row, and eventually hold
-                spin += 1
-                if spin > max_spin:
-                    for k in range(f, frames):
-                        out[k] = cur
-                    break
-                i = (i + 1) % len(pwrows)
-            else:
-                i = j
-                spin = 0
+            spin += 1
+            if spin > max_spin:
+                out[f:frames] = array("H", [cur]) * (frames - f)
+                break
+            i = jump[i]
             continue
 
         # Time-consuming rows reset 'spin'
         spin = 0
 
+        # From here on the output depends only on (row, current PW). If that
+        # pair was seen before, the table is cycling: repeat that period.
+        state = (i, cur)
+        f0 = seen.get(state)
+        if f0 is not None:
+            period = out[f0:f]
+            reps = -(-(frames - f) // len(period))
+            out[f:frames] = (period * reps)[:frames - f]
+            break
+        seen[state] = f
+
         if (l & 0x80):
             # Absolute PW set (consumes 1 frame)
             cur = ((l & 0x0F) << 8) | (r & 0xFF)
@@ -266,13 +398,9 @@ def mat_pw(payload: bytes, pwrows: list, frames: int, pw_base: int) -> list[int]
         else:
             # Sweep: duration=l frames, slope=int8(r) per frame
             slope = r if r < 0x80 else r - 0x100
-            dur = max(1, l)
-            for _ in range(dur):
-                if f >= frames:
-                    break
-                cur = max(1, min(0xFFF, cur + slope))
-                out[f] = cur
-                f += 1
+            n = min(max(1, l), frames - f)
+            cur = sweep_into(out, f, cur, slope, n, 1, 0xFFF)
+            f += n
             i += 1
 
     return out
@@ -281,14 +409,11 @@ def mat_pw(payload: bytes, pwrows: list, frames: int, pw_base: int) -> list[int]
 # Filter materializer
 # ====================================================================================
 
-<<<<<<< HEAD
 def mat_filter(flrows: list, frames: int, fl_base: int,
                cutoff_scale: float = 1.0, res_scale: float = 1.0):  #  calibration
-=======
-def mat_filter(flrows: list, frames: int, fl_base: int):
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
     """
-    Build per-frame filter cutoff values and return (cutoff_list, mode_bits, fr_vic).
+    Build per-frame filter cutoff values and return (cutoff_array, mode_bits, fr_vic).
+    cutoff_array is a packed array('H') like mat_pw()'s output.
 
     Row encodings:
       - CONTROL row: (left & 0x80) OR (third & 0x80)
@@ -311,7 +436,7 @@ def mat_filter(flrows: list, frames: int, fl_base: int):
     cutoff = 0x0600
     mode   = 0x1    # LP
     fr_vic = 0xF1   # packed: resonance + routing
-    out = [cutoff] * max(1, frames)
+    out = array("H", [cutoff]) * max(1, frames)
 
     if not flrows:
         return out, mode, fr_vic
@@ -319,16 +444,14 @@ def mat_filter(flrows: list, frames: int, fl_base: int):
     if not any(l not in (0xFE, 0xFF) for (l, _, __) in flrows):
         return out, mode, fr_vic
 
+    n_rows = len(flrows)
+    jump = fe_next_rows(flrows, fl_base)
     i = 0
     f = 0
     cur = cutoff
-    spin = 0
-    max_spin = len(flrows) + 4
-    last_f = -1
-    no_progress = 0
-    max_no_progress = len(flrows) * 4 + 16
+    spin = 0            # table steps taken without consuming a frame
+    max_spin = n_rows + 4
 
-<<<<<<< HEAD
     #  helpers for calibration
     def scale_cut(v: int) -> int:
         v = int(v * cutoff_scale)
@@ -337,48 +460,27 @@ def mat_filter(flrows: list, frames: int, fl_base: int):
         r = max(0, min(15, int(round(res_nibble * res_scale))))
         return ((r & 0xF) << 4) | (route_bits & 0x7)
 
-=======
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
     while f < frames:
-        # Watchdog for "no progress" scenarios
-        if f == last_f:
-            no_progress += 1
-            if no_progress > max_no_progress:
-                for k in range(f, frames):
-                    out[k] = cur
-                break
-        else:
-            no_progress = 0
-            last_f = f
-
-        if i >= len(flrows):
+        if i >= n_rows:
             i = 0
             spin += 1
             if spin > max_spin:
-                for k in range(f, frames):
-                    out[k] = cur
+                out[f:frames] = array("H", [cur]) * (frames - f)
                 break
             continue
 
         l, r, t = flrows[i]
 
         if l == 0xFF:
-            for k in range(f, frames):
-                out[k] = cur
+            out[f:frames] = array("H", [cur]) * (frames - f)
             break
 
         if l == 0xFE:
-            j = fe_jump_index(r, t, fl_base, len(flrows))
-            if j is None or j == i:
-                spin += 1
-                if spin > max_spin:
-                    for k in range(f, frames):
-                        out[k] = cur
-                    break
-                i = (i + 1) % len(flrows)
-            else:
-                i = j
-                spin = 0
+            spin += 1
+            if spin > max_spin:
+                out[f:frames] = array("H", [cur]) * (frames - f)
+                break
+            i = jump[i]
             continue
 
         spin = 0  # time is going to advance
@@ -390,45 +492,46 @@ def mat_filter(flrows: list, frames: int, fl_base: int):
             band  = (l >> 4) & 0x07
             res   =  l       & 0x0F
             route = (t & 0x07) or 0x1
-            mode  = band_to_mode(band)
-<<<<<<< HEAD
+            mode  = BAND_MODE[band]
             fr_vic= pack_fr_vic(res, route)  #  calibrated resonance pack
             fine  = (t >> 4) & 0x07
-            cur   = scale_cut(min(0x7FF, ((r & 0xFF) << 3) | fine))
-=======
-            fr_vic= ((res & 0xF) << 4) | (route & 0x7)
-            fine  = (t >> 4) & 0x07
-            cur   = min(0x7FF, ((r & 0xFF) << 3) | fine)
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
+            cur   = scale_cut((r << 3) | fine)      # at most 0x7FF by construction
             out[f] = cur
             f += 1
             i += 1
 
         elif l == 0x00:
             # Absolute cutoff set
-<<<<<<< HEAD
-            cur = scale_cut(min(0x7FF, (r & 0xFF) << 3))
-=======
-            cur = min(0x7FF, (r & 0xFF) << 3)
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
+            cur = scale_cut(r << 3)
             out[f] = cur
             f += 1
             i += 1
 
         else:
             # Sweep: duration=l, slope=int8(r)*8
-            dur   = max(1, l)
+            n     = min(max(1, l), frames - f)
             slope = (r if r < 0x80 else r - 0x100) * 8
-            for _ in range(dur):
-                if f >= frames:
-                    break
-<<<<<<< HEAD
-                cur = scale_cut(max(0x000, min(0x7FF, cur + slope)))
-=======
-                cur = max(0x000, min(0x7FF, cur + slope))
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
-                out[f] = cur
-                f += 1
+            if cutoff_scale == 1.0:
+                # scale_cut() is the identity here, so the sweep is a plain ramp
+                cur = sweep_into(out, f, cur, slope, n, 0x000, 0x7FF)
+                f += n
+            else:
+                # Each step is a function of cur alone: once a step leaves cur
+                # unchanged (saturated or scaled to a fixed point), so do all
+                # remaining steps, and the rest of the sweep is a fill.
+                # cur stays within 0..0x7FF, so only the bound the slope
+                # heads for can be crossed
+                clamp, bound = (min, 0x7FF) if slope > 0 else (max, 0x000)
+                end = f + n
+                while f < end:
+                    nxt = scale_cut(clamp(bound, cur + slope))
+                    if nxt == cur:
+                        out[f:end] = array("H", [cur]) * (end - f)
+                        f = end
+                        break
+                    cur = nxt
+                    out[f] = cur
+                    f += 1
             i += 1
 
     return out, mode, fr_vic
@@ -437,7 +540,7 @@ def mat_filter(flrows: list, frames: int, fl_base: int):
 # ARP decoder
 # ====================================================================================
 
-def arp_byte_to_offset(a: int) -> tuple[bool, int]:
+def decode_arp_byte(a: int) -> tuple[bool, int]:
     """
     Decode a single ARP byte as per SID-Wizard player:
 
@@ -463,58 +566,45 @@ def arp_byte_to_offset(a: int) -> tuple[bool, int]:
     # 0x81..0xDF → ABSOLUTE note → not representable with reMID instrument ops
     return False, 0
 
-def materialize_arp_offsets(wf_triplets: list[tuple[int,int,int]], step_frames: int):
-    """
-    Read the WF/ARP table's ARP column and turn it into per-frame absolute
-    semitone offsets (relative to the played note).
+# All 256 ARP bytes decoded once at import; lookups replace the branch cascade
+ARP_LUT = tuple(decode_arp_byte(a) for a in range(256))
 
-    Returns:
-      arp_abs          : List[int] length == (#rows * step_frames)
-      has_loop         : bool (WF table contains an FE jump)
-      loop_start_frame : int  (frame index to loop back to, if has_loop)
+# 1 for ARP bytes that set a non-zero offset. A column with none of them
+# (only 0x00/0x80 and held ABS/chord bytes) stays at offset 0 throughout.
+ARP_MOVES = bytes(1 if ok and off else 0 for ok, off in ARP_LUT)
 
-    Notes:
-    - We read the raw triplets so we can locate FE in the true source table.
-    - For ABS and CHORD entries we *hold* the previous offset (safest fallback).
+def arp_row_offsets(arp_col) -> list[int]:
+    """
+    Per-row absolute semitone offsets (relative to the base note) for a WF
+    table's ARP column, given as bytes.
     """
-    has_loop = False
-    loop_row = None
-
-    # Gather linear steps first (until FE/FF)
-    steps = []
-    for (w, a, x) in wf_triplets:
-        if w == 0xFF:
-            break
-        if w == 0xFE:
-            j = fe_jump_index(a, x, WFTABLEPOS, len(wf_triplets))
-            loop_row = j if j is not None else 0
-            has_loop = True
-            break
-        steps.append((w, a, x))
-
-    # If the table is empty, just return zeros for one step worth of frames
-    if not steps:
-        return [0] * step_frames, False, 0
-
-    # Decode per-row absolute offsets relative to base note
     arp_per_row = []
-    for (_w, a, _x) in steps:
-        ok, off = arp_byte_to_offset(a)
-        if not ok:
-            # For ABS/chord calls we can't compute a relative delta in reMID,
-            # so we hold previous absolute offset (0 if first row).
-            off = arp_per_row[-1] if arp_per_row else 0
+    off = 0
+    for a in arp_col:
+        ok, row_off = ARP_LUT[a]
+        if ok:
+            off = row_off
+        # else: ABS/chord calls have no relative delta in reMID, so we hold the
+        # previous absolute offset (0 if first row).
         arp_per_row.append(off)
+    return arp_per_row
 
-    # Compute the frame index where the loop re-enters
-    loop_start_frame = (loop_row or 0) * step_frames if has_loop else 0
-
-    # Expand row-granularity offsets to per-frame offsets
-    arp_abs = []
-    for off in arp_per_row:
-        arp_abs += [off] * step_frames
+# ====================================================================================
+# Vibrato LFO
+# ====================================================================================
 
-    return arp_abs, has_loop, loop_start_frame
+@lru_cache(maxsize=None)
+def vib_lfo_table(period: int, sine: bool) -> tuple[float, ...]:
+    """
+    One full LFO cycle of 'period' frames: a sine in [-1, 1], or when
+    sine=False a triangle in [-2, 0] (peaks at 0 mid-cycle). Cached per
+    (period, shape) so the emitter indexes a table instead of evaluating the
+    waveform every frame.
+    """
+    if sine:
+        return tuple(math.sin(2 * math.pi * (t / period)) for t in range(period))
+    # branchless form of (4*ph - 2 if ph < 0.5 else 2 - 4*ph)
+    return tuple(-abs(4 * (t / period) - 2) for t in range(period))
 
 # ====================================================================================
 # Emitter: compose a .conf instrument from decoded tracks
@@ -523,7 +613,6 @@ def materialize_arp_offsets(wf_triplets: list[tuple[int,int,int]], step_frames:
 def emit(name: str, payload: bytes, *,
          program_speed=50, speed_mult=1, arp_plus1=False,
          strict_wf=False, emit_arp=True, hard_restart=False,
-<<<<<<< HEAD
          sustain_frames=64,
          #  fidelity toggles
          filter_on_tonal=True,
@@ -533,10 +622,8 @@ def emit(name: str, payload: bytes, *,
          enable_vibrato=False, vib_depth=None, vib_delay=None,
          vib_rate_frames=4, vib_shape="tri",
          #  calibration
-         cutoff_scale=1.0, res_scale=1.0):
-=======
-         sustain_frames=64):
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
+         cutoff_scale=1.0, res_scale=1.0,
+         legacy_wait1=False):
     """
     Convert one .swi instrument payload to a reMID .conf string.
 
@@ -548,143 +635,117 @@ def emit(name: str, payload: bytes, *,
       - emit_arp     : if False, ignore ARP offsets entirely.
       - hard_restart : if True, emit a TEST+GATE jab (0x09) at start (defaults OFF).
       - sustain_frames: how long to continue evolving PW/Filter in one-shot patches.
-<<<<<<< HEAD
       - filter_on_tonal: delay first filter set to first tonal (non-NOISE) frame.
       - oneshot_if_steady_wf: treat constant-WF/no-arp as one-shot (no WF FE loop).
       - respect_gateoff: clear GATE when header gate-off indices are reached.
       - enable_vibrato: add per-frame LFO (depth/delay from header unless overridden).
       - cutoff_scale/res_scale: quick per-project calibration.
-=======
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
+      - legacy_wait1 : one 'wait 1' line per frame instead of merged 'wait N' runs.
     """
     # Sanitize/normalize instrument name for the block header
-    name = re.sub(r'[^A-Za-z0-9_-]+', '-', name.strip()) or "instrument"
+    name = sanitize_name(name)
 
-    # Header parameters
+    # Header parameters (read once; later code uses these locals)
     ad = payload[AD]
     sr = payload[SR]
     wf0 = payload[WF0]
     arp_byte = payload[ARPS] & 0x3F
+    pwpt = payload[PWPT]
+    flpt = payload[FLPT]
 
     # Each WF/ARP row spans this many frames in our output
     step_frames = max(1, arp_byte + (1 if arp_plus1 else 0))
 
     # Parse source tables
     wfrows = rows(payload, WFTABLEPOS)
-    pwrows = rows(payload, payload[PWPT])
-    flrows = rows(payload, payload[FLPT])
+    pwrows = rows(payload, pwpt)
+    flrows = rows(payload, flpt)
 
     # --------------------------------
     # WF sequence + where the WF table loops (row index)
     # --------------------------------
-    wf_steps = []         # [(control_byte, arp_byte, third)]
+    # Parallel per-row byte buffers (control, arp, third) rather than a list of
+    # tuples; the control and ARP columns feed the per-frame tracks below.
+    # rows() already stopped at the FF terminator and its rows are consecutive
+    # payload bytes, so the columns are strided slices of that span.
+    wf_raw = payload[WFTABLEPOS:WFTABLEPOS + 3 * len(wfrows)]
     wf_loop_row = None    # row index target if FE appears
-    for (w, a, x) in wfrows:
-        if w == 0xFF:
-            break
-        if w == 0xFE:
-            # FE pointer: find the destination row
-            j = fe_jump_index(a, x, WFTABLEPOS, len(wfrows))
-            wf_loop_row = j if j is not None else 0
-            break
-        # 'strict_wf' keeps the byte verbatim; otherwise we only clear TEST bit
-        wf_steps.append((w if strict_wf else sanitize(w), a, x))
-
-    if not wf_steps:
+    fe = wf_raw[0::3].find(0xFE)
+    if fe >= 0:
+        # FE pointer: find the destination row; the table ends here
+        _w, a, x = wfrows[fe]
+        j = fe_jump_index(a, x, WFTABLEPOS, len(wfrows))
+        wf_loop_row = j if j is not None else 0
+        wf_raw = wf_raw[:3 * fe]
+    # 'strict_wf' keeps the bytes verbatim; otherwise we only clear TEST bit
+    wf_ctrl  = bytearray(wf_raw[0::3] if strict_wf else wf_raw[0::3].translate(SANITIZE))
+    wf_arp   = bytearray(wf_raw[1::3])
+    wf_third = bytearray(wf_raw[2::3])
+
+    if not wf_ctrl:
         # Fallback: single frame with the initial control byte
-        wf_steps = [((wf0 if strict_wf else sanitize(wf0)), 0x00, 0x00)]
-
-<<<<<<< HEAD
-    # Helper lambdas
-    is_noise = lambda ctrl: (ctrl & 0x80) != 0
-    wf_only  = [w for (w, _a, _x) in wf_steps]
-
-    wf_has_loop = wf_loop_row is not None
-    loop_start_frame = (wf_loop_row or 0) * step_frames
-
-    # Optional heuristic: treat as one-shot if WF becomes steady and ARP is steady
-    if oneshot_if_steady_wf:
-        steady_wf = all(w == wf_only[0] for w in wf_only)
-        # steady ARP is checked later after ARP expansion; we'll decide again there
+        wf_ctrl.append(wf0 if strict_wf else sanitize(wf0))
+        wf_arp.append(0x00)
+        wf_third.append(0x00)
 
-=======
     wf_has_loop = wf_loop_row is not None
     loop_start_frame = (wf_loop_row or 0) * step_frames
 
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
     # Total frames for the "attack" (one pass through WF rows)
-    total_frames = step_frames * len(wf_steps)
+    total_frames = step_frames * len(wf_ctrl)
 
-    # Expand control values to per-frame list
-    wf_abs = [wf_steps[i // step_frames][0] for i in range(total_frames)]
+    # Expand control values to per-frame bytes (rows repeated by strided slices)
+    wf_abs = repeat_each(wf_ctrl, step_frames)
 
     # --------------------------------
     # ARP: materialize absolute semitone offsets per frame
     # --------------------------------
-    if emit_arp:
-        # Use RAW WF table (wfrows) so FE is interpreted correctly
-        arp_abs, _unused_has_loop, _unused_loop_start = materialize_arp_offsets(wfrows, step_frames)
-        # Trim/extend to match total_frames precisely
-        if len(arp_abs) < total_frames:
-            arp_abs += [arp_abs[-1] if arp_abs else 0] * (total_frames - len(arp_abs))
-        else:
-            arp_abs = arp_abs[:total_frames]
+    # Non-arpeggiated patches are common: skip decoding (and later diffing)
+    # an ARP column that can only ever produce offset 0
+    arp_moves = emit_arp and wf_arp.translate(ARP_MOVES).find(1) >= 0
+    if arp_moves:
+        # The ARP column was split off with the WF rows (FE already handled), so
+        # it has one entry per WF row and expands to exactly total_frames
+        arp_abs = repeat_each(arp_row_offsets(wf_arp), step_frames)
     else:
         arp_abs = [0] * total_frames
 
-<<<<<<< HEAD
-    # If one-shot heuristic enabled, refine with ARP: must be steady offsets
+    # Optional heuristic: treat as one-shot if both WF and ARP offsets are steady
     if oneshot_if_steady_wf:
-        steady_wf = all(w == wf_only[0] for w in wf_only)
-        steady_arp = all(a == arp_abs[0] for a in arp_abs) if arp_abs else True
+        steady_wf = wf_ctrl.count(wf_ctrl[0]) == len(wf_ctrl)
+        steady_arp = not arp_moves or arp_abs.count(arp_abs[0]) == len(arp_abs)
         if steady_wf and steady_arp:
             wf_has_loop = False  # override FE loop — musical one-shot
 
     # --------------------------------
-    # Vibrato LFO (optional): add to ARP absolute offsets before differencing
+    # Vibrato LFO (optional): add to ARP absolute offsets before differencing.
+    # Pitch offsets are only written when emit_arp is on.
     # --------------------------------
-    if enable_vibrato:
+    if enable_vibrato and emit_arp:
         # Depth/delay from header unless overridden
         depth = vib_depth if vib_depth is not None else (payload[VIB_DEPTH] & 0x3F)
         delay = vib_delay if vib_delay is not None else (payload[VIB_DELAY] & 0xFF)
         depth_semi = float(depth) / 8.0  # heuristic: map to semitones (0..~8/8=1 by default)
         period = max(2, vib_rate_frames * 4)  # full-cycle frames (triangle default)
 
-        vib = [0.0] * total_frames
-        for f in range(total_frames):
-            if f < delay:
-                vib[f] = 0.0
-            else:
-                t = (f - delay) % period
-                ph = t / period
-                if vib_shape.lower().startswith("s"):
-                    # sine
-                    vib[f] = depth_semi * math.sin(2 * math.pi * ph)
-                else:
-                    # triangle in [-1,1]
-                    tri = 4*ph - 2 if ph < 0.5 else 2 - 4*ph
-                    vib[f] = depth_semi * tri
-        # Combine and quantize to integer semitone offsets at frame resolution
-        comb_abs = [int(round(arp_abs[f] + vib[f])) for f in range(total_frames)]
+        # One precomputed LFO cycle, indexed by phase (no per-frame trig)
+        lfo = vib_lfo_table(period, vib_shape.lower().startswith("s"))
+        # Combine and quantize to integer semitone offsets at frame resolution;
+        # frames before the delay keep their ARP offset unchanged
+        start = min(max(0, delay), total_frames)
+        comb_abs = arp_abs[:start]
+        comb_abs += [int(round(arp_abs[f] + depth_semi * lfo[(f - delay) % period]))
+                     for f in range(start, total_frames)]
     else:
-        comb_abs = arp_abs[:]  # no vibrato
+        comb_abs = arp_abs  # no vibrato; read-only from here on
 
-=======
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
     # --------------------------------
     # Materialize PW and Filter tracks out to the "horizon"
     # --------------------------------
     horizon = total_frames + max(1, sustain_frames)  # allow sustain evolving
-    pw_all  = mat_pw(payload, pwrows, horizon, payload[PWPT])
-<<<<<<< HEAD
-    fl_all, mode, fr_vic = mat_filter(flrows, horizon, payload[FLPT],
+    pw_all  = mat_pw(payload, pwrows, horizon, pwpt)
+    fl_all, mode, fr_vic = mat_filter(flrows, horizon, flpt,
                                       cutoff_scale=cutoff_scale, res_scale=res_scale)
-=======
-    fl_all, mode, fr_vic = mat_filter(flrows, horizon, payload[FLPT])
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
-
-    # Optimization: in many patches PW doesn't move at all in the attack
-    pw_static_attack = all(pw_all[i] == pw_all[0] for i in range(1, total_frames))
 
     # =================================================================================
     # Emit .conf lines
@@ -704,12 +765,12 @@ def emit(name: str, payload: bytes, *,
         "",
         f"[{name}]",
         f"program_speed={program_speed * max(1, speed_mult)}",
-        f"v1_ad=0x{ad:02X}",
-        f"v1_sr=0x{sr:02X}",
+        f"v1_ad=0x{HEX2[ad]}",
+        f"v1_sr=0x{HEX2[sr]}",
         f"filter_mode=0x{mode:X}",
-        f"fr_vic=0x{fr_vic:02X}",
-        f"filter_cutoff=0x{fl_all[0]:04X}",
-        f"v1_pulse=0x{max(1, pw_all[0]):03X}",
+        f"fr_vic=0x{HEX2[fr_vic]}",
+        f"filter_cutoff=0x{HEX4[fl_all[0]]}",
+        f"v1_pulse=0x{HEX3[pw_all[0]]}",
         ""
     ]
 
@@ -720,172 +781,143 @@ def emit(name: str, payload: bytes, *,
         lines.append(f".{t}=v1_control 0x09"); t += 1
         lines.append(f".{t}=wait 1");          t += 1
 
-    # We'll remember where each frame starts (line number) to jump precisely.
-    frame_line = []
+    # We'll remember where each event frame starts (line number) to jump precisely.
+    frame_line = {}
     # We'll also remember the line number right AFTER the initial seed.
     loop_entry_line_after_seed = None
 
-<<<<<<< HEAD
-    # Gate-off handling state (NEW)
-    gate_cleared = False
-    go_wf = payload[GO_WF] if respect_gateoff else 0xFF
-    go_pw = payload[GO_PW] if respect_gateoff else 0xFF
-    go_fl = payload[GO_FL] if respect_gateoff else 0xFF
+    # Gate-off handling (NEW): GATE is cleared once, on the first frame of the
+    # earliest gate-off row (never if that row lies beyond the attack).
+    go_rows = [payload[GO_WF], payload[GO_PW], payload[GO_FL]] if respect_gateoff else []
+    go_rows = [row for row in go_rows if row != 0xFF]
+    gate_off_frame = min(go_rows) * step_frames if go_rows else -1
 
     # Find the first tonal frame for filter-on-tonal (NEW)
+    # Rows hold for step_frames, so search the row column: NOISE_BIT maps each
+    # control byte to its NOISE bit and find(0) is the first tonal row.
     first_tonal_f = 0
-    if filter_on_tonal and total_frames >= 2 and is_noise(wf_abs[0]):
-        for idx in range(1, total_frames):
-            if not is_noise(wf_abs[idx]):
-                first_tonal_f = idx
-                break
+    if filter_on_tonal:
+        tonal_row = wf_ctrl.translate(NOISE_BIT).find(0)
+        if tonal_row > 0:   # > 0: row 0 itself is NOISE
+            first_tonal_f = tonal_row * step_frames
+    delay_filter = first_tonal_f > 0   # first cutoff is written at first_tonal_f
+
+    append = lines.append  # bound once for the per-frame loops
+
+    # Everything the attack writes after frame 0, as (frame, kind, value) events:
+    # track changes, the delayed first cutoff, gate-off, and a marker on the loop
+    # target (a goto must land on the first line of its frame). Frames without
+    # events only extend a wait run.
+    # Control and (without vibrato) ARP only change on WF row boundaries. A PW
+    # track that is static over the attack simply yields no events.
+    row_steps = (step_frames, 1, 1, 1 if enable_vibrato else step_frames)
+    events = build_events(wf_abs, pw_all, fl_all,
+                          comb_abs if arp_moves or (enable_vibrato and emit_arp) else None,
+                          1, total_frames, row_steps)
+    if delay_filter and fl_all[first_tonal_f] == fl_all[first_tonal_f - 1]:
+        events.append((first_tonal_f, EV_FL, fl_all[first_tonal_f]))
+    if 0 < gate_off_frame < total_frames:
+        events.append((gate_off_frame, EV_GATE, wf_abs[gate_off_frame] & ~0x01))
+    if wf_has_loop and 0 < loop_start_frame < total_frames:
+        events.append((loop_start_frame, EV_MARK, 0))
+    events.sort()
 
-=======
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
     # ------------- Attack pass (one run across WF table) -------------
-    for f in range(0, total_frames):
-        frame_line.append(t)
-
-<<<<<<< HEAD
-        row_idx = f // step_frames  # current WF row
-
-=======
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
-        if f == 0:
-            # First frame: set control byte (waveform + gate/sync/ring)
-            lines.append(f".{t}=v1_control 0x{wf_abs[0]:02X}"); t += 1
-
-            # ARP "seed" for frame 0 (absolute offset relative to played note)
-<<<<<<< HEAD
-            if emit_arp and comb_abs[0] != 0:
-                lines.append(f".{t}=v1_freq_hs {comb_abs[0]}"); t += 1
-=======
-            if emit_arp and arp_abs[0] != 0:
-                lines.append(f".{t}=v1_freq_hs {arp_abs[0]}"); t += 1
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
-
-            # IMPORTANT: Loop should re-enter AFTER we apply the seed
-            loop_entry_line_after_seed = t
-
-<<<<<<< HEAD
-            # Initialize PW and (optionally delayed) filter at their first values
-            lines.append(f".{t}=v1_pulse 0x{max(1, pw_all[0]):03X}"); t += 1
-            if not (filter_on_tonal and first_tonal_f > 0):
-                lines.append(f".{t}=filter_cutoff 0x{fl_all[0]:04X}");   t += 1
-=======
-            # Initialize PW and filter at their first values
-            lines.append(f".{t}=v1_pulse 0x{max(1, pw_all[0]):03X}"); t += 1
-            lines.append(f".{t}=filter_cutoff 0x{fl_all[0]:04X}");   t += 1
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
-
-        else:
-            # Control changes only when the control byte actually changes
-            if wf_abs[f] != wf_abs[f-1]:
-                lines.append(f".{t}=v1_control 0x{wf_abs[f]:02X}"); t += 1
-
-            # Avoid "PW chatter" if attack PW is static
-            if (not pw_static_attack) and pw_all[f] != pw_all[f-1]:
-                lines.append(f".{t}=v1_pulse 0x{pw_all[f]:03X}");   t += 1
-
-<<<<<<< HEAD
-            # Filter cutoff changes (with optional delay to tonal frame)
-            if fl_all[f] != fl_all[f-1] or (filter_on_tonal and f == first_tonal_f and first_tonal_f > 0):
-                lines.append(f".{t}=filter_cutoff 0x{fl_all[f]:04X}"); t += 1
-
-            # ARP delta for this frame (relative change only; vibrato included if enabled)
-            if emit_arp:
-                d = comb_abs[f] - comb_abs[f-1]
-                if d != 0:
-                    lines.append(f".{t}=v1_freq_hs {d}"); t += 1
-
-        # Respect gate-off indices (only once)
-        if respect_gateoff and not gate_cleared:
-            if ((go_wf != 0xFF and row_idx == go_wf) or
-                (go_pw != 0xFF and row_idx == go_pw) or
-                (go_fl != 0xFF and row_idx == go_fl)):
-                # Clear GATE bit on current control
-                ctrl_no_gate = wf_abs[f] & ~0x01
-                lines.append(f".{t}=v1_control 0x{ctrl_no_gate:02X}"); t += 1
-                gate_cleared = True
-
-=======
-            # Filter cutoff changes
-            if fl_all[f] != fl_all[f-1]:
-                lines.append(f".{t}=filter_cutoff 0x{fl_all[f]:04X}"); t += 1
-
-            # ARP delta for this frame (relative change only)
-            if emit_arp:
-                d = arp_abs[f] - arp_abs[f-1]
-                if d != 0:
-                    lines.append(f".{t}=v1_freq_hs {d}"); t += 1
-
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
-        # Each WF/ARP row frame consumes 1 tick
-        lines.append(f".{t}=wait 1"); t += 1
+    # First frame: set control byte (waveform + gate/sync/ring)
+    frame_line[0] = t
+    append(f".{t}=v1_control 0x{HEX2[wf_abs[0]]}"); t += 1
+
+    # ARP "seed" for frame 0 (absolute offset relative to played note)
+    if emit_arp and comb_abs[0] != 0:
+        append(f".{t}=v1_freq_hs {comb_abs[0]}"); t += 1
+
+    # IMPORTANT: Loop should re-enter AFTER we apply the seed
+    loop_entry_line_after_seed = t
+
+    # Initialize PW and (optionally delayed) filter at their first values
+    append(f".{t}=v1_pulse 0x{HEX3[pw_all[0]]}"); t += 1
+    if not delay_filter:
+        append(f".{t}=filter_cutoff 0x{HEX4[fl_all[0]]}");   t += 1
+
+    # Respect gate-off indices (only once): clear GATE bit on current control
+    if gate_off_frame == 0:
+        append(f".{t}=v1_control 0x{HEX2[wf_abs[0] & ~0x01]}"); t += 1
+
+    # Later frames: dispatch events in (frame, kind) order, idling in between
+    cur = 0
+    for f, kind, value in events:
+        if f != cur:
+            t = add_wait(lines, t, f - cur, legacy_wait1)
+            cur = f
+            frame_line[f] = t
+        if kind == EV_CTRL or kind == EV_GATE:
+            append(f".{t}=v1_control 0x{HEX2[value]}"); t += 1
+        elif kind == EV_PW:
+            append(f".{t}=v1_pulse 0x{HEX3[value]}");   t += 1
+        elif kind == EV_FL:
+            append(f".{t}=filter_cutoff 0x{HEX4[value]}"); t += 1
+        elif kind == EV_ARP:
+            # relative change only; vibrato included if enabled
+            append(f".{t}=v1_freq_hs {value}"); t += 1
+    t = add_wait(lines, t, total_frames - cur, legacy_wait1)
 
     # ------------- Loop or Sustain -------------
     if wf_has_loop:
         # Ensure the absolute ARP offset at loop-start equals the target.
         if emit_arp:
-<<<<<<< HEAD
             target = comb_abs[loop_start_frame] if loop_start_frame < len(comb_abs) else 0
             cur    = comb_abs[total_frames - 1]
-=======
-            target = arp_abs[loop_start_frame] if loop_start_frame < len(arp_abs) else 0
-            cur    = arp_abs[total_frames - 1]
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
             wrap   = target - cur
             if wrap != 0:
-                lines.append(f".{t}=v1_freq_hs {wrap}"); t += 1
+                append(f".{t}=v1_freq_hs {wrap}"); t += 1
 
         # If FE jumps to row 0, re-enter AFTER the seed; else jump to that row's first frame.
         if loop_start_frame == 0 and loop_entry_line_after_seed is not None:
             loop_line = loop_entry_line_after_seed
         else:
-            loop_line = (frame_line[loop_start_frame]
-                         if loop_start_frame < len(frame_line)
-                         else (frame_line[0] if frame_line else 0))
+            loop_line = frame_line.get(loop_start_frame, frame_line[0])
 
-        lines.append(f".{t}=goto {loop_line}"); t += 1
+        append(f".{t}=goto {loop_line}"); t += 1
 
     else:
         # One-shot: keep last waveform and evolve PW/Filter during sustain horizon.
-        last_wf = wf_abs[-1] if wf_abs else sanitize(payload[WF0])
+        last_wf = wf_abs[-1] if wf_abs else sanitize(wf0)
 
         # Return pitch to base if we had a non-zero offset at the end.
-<<<<<<< HEAD
         if emit_arp and comb_abs[-1] != 0:
-            lines.append(f".{t}=v1_freq_hs {-comb_abs[-1]}"); t += 1
-=======
-        if emit_arp and arp_abs[-1] != 0:
-            lines.append(f".{t}=v1_freq_hs {-arp_abs[-1]}"); t += 1
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
+            append(f".{t}=v1_freq_hs {-comb_abs[-1]}"); t += 1
 
-        lines.append(f".{t}=v1_control 0x{last_wf:02X}"); t += 1
+        append(f".{t}=v1_control 0x{HEX2[last_wf]}"); t += 1
 
         sustain_start = t
         # Initialize sustain with the first values after the attack
-        lines.append(f".{t}=v1_pulse 0x{max(1, pw_all[total_frames]):03X}"); t += 1
-        lines.append(f".{t}=filter_cutoff 0x{fl_all[total_frames]:04X}");   t += 1
-        lines.append(f".{t}=wait 1"); t += 1
-
-        # Continue evolving PW/Filter through the sustain horizon
-        for f in range(total_frames + 1, horizon):
-            if pw_all[f] != pw_all[f-1]:
-                lines.append(f".{t}=v1_pulse 0x{pw_all[f]:03X}");   t += 1
-            if fl_all[f] != fl_all[f-1]:
-                lines.append(f".{t}=filter_cutoff 0x{fl_all[f]:04X}"); t += 1
-            lines.append(f".{t}=wait 1"); t += 1
+        append(f".{t}=v1_pulse 0x{HEX3[pw_all[total_frames]]}"); t += 1
+        append(f".{t}=filter_cutoff 0x{HEX4[fl_all[total_frames]]}");   t += 1
+
+        # Continue evolving PW/Filter through the sustain horizon (change frames only)
+        cur = total_frames
+        for f, kind, value in build_events(None, pw_all, fl_all, None, total_frames + 1, horizon):
+            if f != cur:
+                t = add_wait(lines, t, f - cur, legacy_wait1)
+                cur = f
+            if kind == EV_PW:
+                append(f".{t}=v1_pulse 0x{HEX3[value]}");   t += 1
+            else:
+                append(f".{t}=filter_cutoff 0x{HEX4[value]}"); t += 1
+        t = add_wait(lines, t, horizon - cur, legacy_wait1)
 
         # Loop the sustain region
-        lines.append(f".{t}=goto {sustain_start}"); t += 1
+        append(f".{t}=goto {sustain_start}"); t += 1
 
-    # Diagnostics footer: raw decoded rows for easier debugging
+    # Diagnostics footer: raw decoded rows for easier debugging.
+    # wfrows are consecutive payload triplets: hex them in one call, then cut
+    # the "XX,XX,XX," groups apart.
+    wf_hex = payload[WFTABLEPOS:WFTABLEPOS + 3 * len(wfrows)].hex(",").upper()
     lines += [
         "",
-        "# Raw WF rows: " + " | ".join(f"{w:02X},{a:02X},{x:02X}" for (w, a, x) in wfrows),
-        f"# Raw PW bytes (@0x{payload[PWPT]:02X}): {hexb(cut_at_ff(payload, payload[PWPT]))}",
-        f"# Raw FL bytes (@0x{payload[FLPT]:02X}): {hexb(cut_at_ff(payload, payload[FLPT]))}"
+        "# Raw WF rows: " + " | ".join(wf_hex[i:i + 8] for i in range(0, len(wf_hex), 9)),
+        f"# Raw PW bytes (@0x{HEX2[pwpt]}): {hexb(cut_at_ff(payload, pwpt))}",
+        f"# Raw FL bytes (@0x{HEX2[flpt]}): {hexb(cut_at_ff(payload, flpt))}"
     ]
 
     return "\n".join(lines)
@@ -894,11 +926,95 @@ def emit(name: str, payload: bytes, *,
 # CLI
 # ====================================================================================
 
+def emit_kwargs(args) -> dict:
+    """emit() keyword arguments from the parsed command line."""
+    return dict(
+        program_speed=args.program_speed,
+        speed_mult=args.speed_mult,
+        arp_plus1=args.arp_plus1,
+        strict_wf=args.strict_wf,
+        emit_arp=not args.no_emit_arp,
+        hard_restart=args.hard_restart,
+        sustain_frames=max(1, args.sustain_frames),
+        #  fidelity toggles (defaults ON)
+        filter_on_tonal=not args.no_filter_on_tonal,
+        oneshot_if_steady_wf=not args.no_oneshot_if_steady_wf,
+        respect_gateoff=args.respect_gateoff,
+        #  vibrato
+        enable_vibrato=args.enable_vibrato,
+        vib_depth=args.vib_depth,
+        vib_delay=args.vib_delay,
+        vib_rate_frames=max(1, args.vib_rate_frames),
+        vib_shape=args.vib_shape,
+        #  calibration
+        cutoff_scale=max(0.01, args.cutoff_scale),
+        res_scale=max(0.01, args.res_scale),
+        #  output format
+        legacy_wait1=args.legacy_wait1,
+    )
+
+@lru_cache(maxsize=None)
+def source_digest() -> bytes:
+    """SHA-256 of this script, so cached presets are invalidated by converter changes."""
+    return hashlib.sha256(Path(__file__).read_bytes()).digest()
+
+def convert_cached(swi_path: Path, out_path: Path, kwargs: dict, cache_dir) -> bool:
+    """
+    Convert one .swi file to out_path, reusing a previous result when possible.
+    Results are stored in cache_dir under a SHA-256 of this script's source, the
+    payload and the emit options; cache_dir=None disables the cache.
+    Returns True on a cache hit.
+    """
+    payload = read_payload(swi_path)
+    name = payload_name(payload) or swi_path.stem
+    if cache_dir is not None:
+        h = hashlib.sha256(source_digest())
+        h.update(payload)
+        h.update(repr((name, sorted(kwargs.items()))).encode())
+        cached = cache_dir / (h.hexdigest() + ".conf")
+        if cached.is_file():
+            shutil.copyfile(cached, out_path)
+            return True
+    # Encode once; the cache entry is written from the same buffer rather
+    # than copied back from out_path
+    data = emit(name, payload, **kwargs).encode("utf-8")
+    out_path.write_bytes(data)
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Publish atomically: parallel workers may produce the same entry
+        tmp = cached.with_name(f"{cached.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, cached)
+    return False
+
+def convert_one(swi_path: Path, out_path: Path, kwargs: dict, cache_dir) -> tuple[str, str, str]:
+    """
+    Batch-mode worker: convert_cached() for one file, with any failure kept
+    to that file. Returns (swi_path, status, detail) with status
+    Wrote / Cached / FAIL; detail is the output path or the error.
+    """
+    try:
+        hit = convert_cached(swi_path, out_path, kwargs, cache_dir)
+        return str(swi_path), "Cached" if hit else "Wrote", str(out_path)
+    except (Exception, SystemExit) as e:
+        # read_payload() rejects bad files with SystemExit
+        return str(swi_path), "FAIL", str(e)
+
 def main():
     ap = argparse.ArgumentParser(description="Convert SID-Wizard .swi instrument to reMID .conf")
-    ap.add_argument("--in",  dest="inp",  required=True, help="input .swi file")
-    ap.add_argument("--out", dest="outp", required=True, help="output .conf file")
-    ap.add_argument("--name", default=None, help="override instrument name")
+    ap.add_argument("--in",  dest="inp",  default=None, help="input .swi file")
+    ap.add_argument("--out", dest="outp", default=None, help="output .conf file")
+    ap.add_argument("--name", default=None, help="override instrument name (single file only)")
+
+    # Batch mode
+    ap.add_argument("--in-glob", default=None, help="convert every .swi matching this glob (batch mode)")
+    ap.add_argument("--in-dir", default=None, help="convert every .swi in this folder (batch mode)")
+    ap.add_argument("--out-dir", default=None, help="output folder for batch mode (<stem>.conf)")
+    ap.add_argument("--cache-dir", default=os.path.join("~", ".cache", "swi2remid"),
+                    help="batch-mode cache of converted presets, keyed by content hash")
+    ap.add_argument("--no-cache", action="store_true", help="always convert in batch mode")
+    ap.add_argument("--jobs", type=int, default=None,
+                    help="worker processes for batch mode (default: CPU count)")
 
     # Timing knobs
     ap.add_argument("--program-speed", type=int, default=50, help="global tick rate (50 ≈ PAL)")
@@ -911,7 +1027,6 @@ def main():
     ap.add_argument("--hard-restart",  action="store_true",  help="emit TEST+GATE jab at start (default OFF)")
     ap.add_argument("--sustain-frames", type=int, default=64, help="frames to evolve PW/Filter in one-shot patches")
 
-<<<<<<< HEAD
     #  fidelity toggles
     ap.add_argument("--no-filter-on-tonal", action="store_true",
                     help="do NOT delay first filter set to first tonal frame")
@@ -938,42 +1053,65 @@ def main():
     ap.add_argument("--res-scale", type=float, default=1.0,
                     help="scale resonance nibble before packing into fr_vic")
 
-=======
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
+    #  output format
+    ap.add_argument("--legacy-wait1", action="store_true",
+                    help="one 'wait 1' line per frame instead of merged 'wait N' runs")
+
     args = ap.parse_args()
 
+    if args.in_dir is not None:
+        if args.in_glob is not None:
+            ap.error("use either --in-dir or --in-glob")
+        args.in_glob = os.path.join(glob.escape(args.in_dir), "*.swi")
+
+    if args.in_glob is not None:
+        if args.out_dir is None:
+            ap.error("--in-glob/--in-dir requires --out-dir")
+        if args.inp is not None or args.outp is not None or args.name is not None:
+            ap.error("--in/--out/--name cannot be combined with --in-glob/--in-dir")
+        out_dir = Path(args.out_dir)
+        swi_paths = [Path(fn) for fn in sorted(glob.glob(args.in_glob))]
+        if not swi_paths:
+            print(f"No .swi files matched {args.in_glob}")
+            return
+        out_paths = [out_dir / (p.stem + ".conf") for p in swi_paths]
+        # A glob can span folders: inputs sharing a stem would race for one output
+        by_out = {}
+        for p, o in zip(swi_paths, out_paths):
+            by_out.setdefault(o, []).append(str(p))
+        clashes = [srcs for srcs in by_out.values() if len(srcs) > 1]
+        if clashes:
+            ap.error("inputs map to the same output file: "
+                     + "; ".join(", ".join(srcs) for srcs in clashes))
+        out_dir.mkdir(parents=True, exist_ok=True)
+        cache_dir = None if args.no_cache else Path(args.cache_dir).expanduser()
+        # Files are independent: convert them in worker processes. Imported
+        # here because it dominates startup of a single-file run.
+        from concurrent.futures import ProcessPoolExecutor
+        failed = 0
+        with ProcessPoolExecutor(max_workers=args.jobs) as ex:
+            results = ex.map(convert_one, swi_paths, out_paths,
+                             repeat(emit_kwargs(args)), repeat(cache_dir), chunksize=8)
+            for swi, status, detail in results:
+                if status == "FAIL":
+                    failed += 1
+                    print(f"FAIL {swi}: {detail}", file=sys.stderr)
+                else:
+                    print(f"{status} {detail}")
+        if failed:
+            raise SystemExit(f"{failed} of {len(swi_paths)} file(s) failed")
+        return
+
+    if args.inp is None or args.outp is None:
+        ap.error("--in and --out are required (or use --in-dir/--in-glob with --out-dir)")
+
     payload = read_payload(Path(args.inp))
 
     # Instrument display/name: try last 8 chars of payload, else file stem
-    nm = payload[-8:].decode("ascii", "ignore").strip() or Path(args.inp).stem
+    nm = payload_name(payload) or Path(args.inp).stem
     name = args.name or nm
 
-    txt = emit(
-        name, payload,
-        program_speed=args.program_speed,
-        speed_mult=args.speed_mult,
-        arp_plus1=args.arp_plus1,
-        strict_wf=args.strict_wf,
-        emit_arp=not args.no_emit_arp,
-        hard_restart=args.hard_restart,
-        sustain_frames=max(1, args.sustain_frames),
-<<<<<<< HEAD
-        #  fidelity toggles (defaults ON)
-        filter_on_tonal=not args.no_filter_on_tonal,
-        oneshot_if_steady_wf=not args.no_oneshot_if_steady_wf,
-        respect_gateoff=args.respect_gateoff,
-        #  vibrato
-        enable_vibrato=args.enable_vibrato,
-        vib_depth=args.vib_depth,
-        vib_delay=args.vib_delay,
-        vib_rate_frames=max(1, args.vib_rate_frames),
-        vib_shape=args.vib_shape,
-        #  calibration
-        cutoff_scale=max(0.01, args.cutoff_scale),
-        res_scale=max(0.01, args.res_scale),
-=======
->>>>>>> db91893acba1d4e501166c4a051ff974abbf4dd9
-    )
+    txt = emit(name, payload, **emit_kwargs(args))
 
     Path(args.outp).write_text(txt, encoding="utf-8")
     print(f"Wrote {args.outp}")